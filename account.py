@@ -0,0 +1,16 @@
+import time
+
+class Account:
+    """
+    Account class for Zakat Blockchain Simulation
+    Holds a student node's balance, roll number seed key and creation time
+    """
+    __slots__ = ('balance', 'roll_no', 'created_at')
+
+    def __init__(self, balance, roll_no, created_at=None):
+        self.balance = balance
+        self.roll_no = roll_no  # Student roll number as seed key
+        self.created_at = time.time() if created_at is None else created_at
+
+    def __repr__(self):
+        return f"Account(balance={self.balance!r}, roll_no={self.roll_no!r}, created_at={self.created_at!r})"
@@ -1,16 +1,37 @@
 import streamlit as st
+import pandas as pd
 import json
-from transaction import Transaction
+from account import Account
 from miner import Blockchain
+from transaction import ZAKAT_RATE
 import hashlib
+import threading
 import time
 
+PAGE = 50  # Items rendered per page in long listings
+CHAIN_PATH = "chain.jsonl"  # Blocks are appended here so the chain survives restarts
+CACHE_ENTRIES = 32  # Formatted pages kept per cached helper, shared by all sessions
+
+@st.cache_resource
+def _shared_blockchain():
+    """One blockchain per server process, so every session extends the same chain file"""
+    return Blockchain.open(CHAIN_PATH)
+
+@st.cache_resource
+def _chain_lock():
+    """Lock held while a session adds a block to the shared chain"""
+    return threading.Lock()
+
 # Initialize session state
 if 'blockchain' not in st.session_state:
-    st.session_state.blockchain = Blockchain()
+    try:
+        st.session_state.blockchain = _shared_blockchain()
+    except ValueError as e:
+        st.error(f"Could not load {CHAIN_PATH}: {e}")
+        st.stop()
 if 'accounts' not in st.session_state:
     st.session_state.accounts = {}
-    st.session_state.accounts["Zakat_Account"] = {'balance': 0.0, 'roll_no': '0000'}
+    st.session_state.accounts["Zakat_Account"] = Account(0.0, '0000')
 if 'pending_transactions' not in st.session_state:
     st.session_state.pending_transactions = []
 if 'transaction_history' not in st.session_state:
@@ -18,7 +39,32 @@ if 'transaction_history' not in st.session_state:
 
 def calculate_zakat(amount):
     """Calculate zakat (2.5% of the amount)"""
-    return amount * 0.025
+    return amount * ZAKAT_RATE
+
+@st.cache_data(max_entries=CACHE_ENTRIES)
+def _regular_accounts(account_names):
+    """Account names that can send or receive transfers (everything but the Zakat Account)"""
+    return tuple(name for name in account_names if name != "Zakat_Account")
+
+def _account_rows(accounts):
+    """Build one table row per account for st.dataframe"""
+    return [
+        {
+            'Account': name,
+            'Balance': data.balance,
+            'Roll': "N/A" if name == "Zakat_Account" else data.roll_no
+        }
+        for name, data in accounts.items()
+    ]
+
+def display_account_table(accounts):
+    """Render all accounts as a single table widget"""
+    st.dataframe(
+        pd.DataFrame(_account_rows(accounts)),
+        hide_index=True,
+        use_container_width=True,
+        column_config={'Balance': st.column_config.NumberColumn(format="$%.2f")}
+    )
 
 def create_account(name, balance, roll_no):
     """Create a new account with initial balance and roll number"""
@@ -31,11 +77,12 @@ def create_account(name, balance, roll_no):
     if not roll_no or roll_no.strip() == "":
         return False, "Roll number cannot be empty"
     
-    st.session_state.accounts[name] = {
-        'balance': balance,
-        'roll_no': roll_no.strip(),
-        'created_at': time.time()
-    }
+    # An account seen on the chain in an earlier run keeps the balance the chain gives it
+    blockchain = st.session_state.blockchain
+    if name in blockchain.balances:
+        balance = blockchain.calculate_account_balance_from_history(name)
+    
+    st.session_state.accounts[name] = Account(float(balance), roll_no.strip())
     return True, f"Account '{name}' created with balance ${balance:.2f} and roll number {roll_no.strip()}"
 
 def perform_transaction(sender, receiver, amount):
@@ -55,76 +102,67 @@ def perform_transaction(sender, receiver, amount):
     
     zakat_amount = calculate_zakat(amount)
     total_amount = amount + zakat_amount
-    
-    try:
-        if "Zakat_Account" not in st.session_state.accounts:
-            st.session_state.accounts["Zakat_Account"] = {'balance': 0.0, 'roll_no': '0000'}
-        
-        temp_accounts = {}
-        for acc_name, acc_data in st.session_state.accounts.items():
-            if isinstance(acc_data, dict):
-                temp_accounts[acc_name] = acc_data['balance']
-            else:
-                temp_accounts[acc_name] = acc_data
-        
-        main_transaction = Transaction(sender, receiver, amount)
-        main_transaction.apply(temp_accounts)
-        
-        zakat_transaction = Transaction(sender, "Zakat_Account", zakat_amount)
-        zakat_transaction.apply(temp_accounts)
-        
-        for acc_name, balance in temp_accounts.items():
-            if acc_name in st.session_state.accounts:
-                if isinstance(st.session_state.accounts[acc_name], dict):
-                    st.session_state.accounts[acc_name]['balance'] = balance
-                else:
-                    st.session_state.accounts[acc_name] = balance
-        
-        transaction_record = {
-            'timestamp': time.time(),
+    now = time.time()
+    now_str = time.ctime(now)
+    
+    accounts = st.session_state.accounts
+    if "Zakat_Account" not in accounts:
+        accounts["Zakat_Account"] = Account(0.0, '0000')
+    
+    sender_balance = accounts[sender].balance
+    if sender_balance < total_amount:
+        return False, f"Transaction failed: Insufficient balance. {sender} has ${sender_balance:.2f} but needs ${total_amount:.2f}"
+    
+    # Both parties and the Zakat Account are known, so update the three balances in place
+    accounts[sender].balance -= total_amount
+    accounts[receiver].balance += amount
+    accounts["Zakat_Account"].balance += zakat_amount
+    sender_remaining_balance = sender_balance - total_amount
+    
+    st.session_state.transaction_history.extend([
+        {
+            'timestamp': now,
+            'timestamp_str': now_str,
             'sender': sender,
             'receiver': receiver,
             'amount': amount,
             'zakat_amount': zakat_amount,
             'total_cost': total_amount,
-            'sender_remaining_balance': temp_accounts[sender],
+            'sender_remaining_balance': sender_remaining_balance,
             'type': 'transfer'
-        }
-        st.session_state.transaction_history.append(transaction_record)
-        
-        zakat_record = {
-            'timestamp': time.time(),
+        },
+        {
+            'timestamp': now,
+            'timestamp_str': now_str,
             'sender': sender,
             'receiver': 'Zakat_Account',
             'amount': zakat_amount,
             'zakat_amount': 0,
             'total_cost': zakat_amount,
-            'sender_remaining_balance': temp_accounts[sender],
+            'sender_remaining_balance': sender_remaining_balance,
             'type': 'zakat'
         }
-        st.session_state.transaction_history.append(zakat_record)
-        
-        st.session_state.pending_transactions.extend([
-            {
-                'sender': sender,
-                'receiver': receiver,
-                'amount': amount,
-                'type': 'transfer',
-                'timestamp': time.time()
-            },
-            {
-                'sender': sender,
-                'receiver': 'Zakat_Account',
-                'amount': zakat_amount,
-                'type': 'zakat',
-                'timestamp': time.time()
-            }
-        ])
-        
-        return True, f"Transaction successful! Transfer: ${amount:.2f}, Zakat: ${zakat_amount:.2f}"
+    ])
+    
+    st.session_state.pending_transactions.extend([
+        {
+            'sender': sender,
+            'receiver': receiver,
+            'amount': amount,
+            'zakat_amount': zakat_amount,
+            'type': 'transfer',
+            'timestamp': now
+        },
+        {
+            'sender': sender,
+            'receiver': 'Zakat_Account',
+            'amount': zakat_amount,
+            'type': 'zakat',
+            'timestamp': now
+        }
+    ])
     
-    except Exception as e:
-        return False, f"Transaction failed: {str(e)}"
+    return True, f"Transaction successful! Transfer: ${amount:.2f}, Zakat: ${zakat_amount:.2f}"
 
 def mine_block():
     """Mine a new block with pending transactions"""
@@ -135,14 +173,15 @@ def mine_block():
     sender = first_tx['sender']
     
     if sender in st.session_state.accounts:
-        roll_no = st.session_state.accounts[sender]['roll_no']
+        roll_no = st.session_state.accounts[sender].roll_no
     else:
         roll_no = "0000"
     
-    success = st.session_state.blockchain.add_block(
-        transactions=st.session_state.pending_transactions,
-        roll_no=roll_no
-    )
+    with _chain_lock():
+        success = st.session_state.blockchain.add_block(
+            transactions=st.session_state.pending_transactions,
+            roll_no=roll_no
+        )
     
     if success:
         st.session_state.pending_transactions = []
@@ -150,35 +189,86 @@ def mine_block():
     else:
         return False, "Failed to mine block"
 
+def _page_bounds(offset_key, total):
+    """Return the (start, end) slice of the current page, newest items last"""
+    offset = min(st.session_state.get(offset_key, 0), max(total - 1, 0))
+    end = total - offset
+    return max(0, end - PAGE), end
+
+def _shift_page(offset_key, delta):
+    """Move a paginated view by delta items (positive goes further back in time)"""
+    st.session_state[offset_key] = max(0, st.session_state.get(offset_key, 0) + delta)
+
+def display_pager(offset_key, start, end, total, label):
+    """Show the page position and buttons to move between older and newer items"""
+    if total <= PAGE:
+        return
+    st.caption(f"Showing {label} {start + 1}-{end} of {total}")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.button("Load older", key=f"{offset_key}_older", disabled=start == 0,
+                  on_click=_shift_page, args=(offset_key, PAGE))
+    with col2:
+        st.button("Show newer", key=f"{offset_key}_newer", disabled=end == total,
+                  on_click=_shift_page, args=(offset_key, -PAGE))
+
+@st.cache_data(max_entries=CACHE_ENTRIES)
+def _format_blockchain(block_hashes, first_index, _blocks):
+    """Pre-format block details, cached on the displayed blocks' hashes"""
+    rows = []
+    for i, block in enumerate(_blocks, start=first_index):
+        if i == 0:
+            tx_lines = None
+        else:
+            tx_lines = []
+            for j, tx in enumerate(block.transactions):
+                tx_type = tx.get('type', 'transfer')
+                if tx_type == 'zakat':
+                    tx_lines.append(f"  {j+1}. Zakat: {tx['sender']} → {tx['receiver']}: ${tx['amount']:.2f}")
+                else:
+                    tx_lines.append(f"  {j+1}. Transfer: {tx['sender']} → {tx['receiver']}: ${tx['amount']:.2f}")
+        rows.append({
+            'title': f"Block #{i} - {block.hash[:10]}...",
+            'details': [
+                f"**Hash:** {block.hash}",
+                f"**Previous Hash:** {block.prev_hash}",
+                f"**Timestamp:** {block.timestamp_str}",
+                f"**Roll No (Seed Key):** {block.roll_no}"
+            ],
+            'transactions': tx_lines
+        })
+    return rows
+
 def display_blockchain():
     """Display the blockchain in a readable format"""
     st.subheader("Blockchain")
     
-    if len(st.session_state.blockchain.chain) == 1:
+    chain = st.session_state.blockchain.chain
+    if len(chain) == 1:
         st.info("Only genesis block exists. Mine some transactions to see more blocks!")
         return
     
-    for i, block in enumerate(st.session_state.blockchain.chain):
-        with st.expander(f"Block #{i} - {block.hash[:10]}..."):
+    # Only render one page of blocks (the latest by default) to bound the widget count
+    start, end = _page_bounds('blockchain_offset', len(chain))
+    display_pager('blockchain_offset', start, end, len(chain), "blocks")
+    
+    blocks = chain[start:end]
+    rows = _format_blockchain(tuple(block.hash for block in blocks), start, blocks)
+    for row in rows:
+        with st.expander(row['title']):
             col1, col2 = st.columns(2)
             
             with col1:
-                st.write(f"**Hash:** {block.hash}")
-                st.write(f"**Previous Hash:** {block.prev_hash}")
-                st.write(f"**Timestamp:** {time.ctime(block.timestamp)}")
-                st.write(f"**Roll No (Seed Key):** {block.roll_no}")
+                for line in row['details']:
+                    st.write(line)
             
             with col2:
-                if i == 0:
+                if row['transactions'] is None:
                     st.write("**Content:** Genesis Block")
                 else:
                     st.write("**Transactions:**")
-                    for j, tx in enumerate(block.transactions):
-                        tx_type = tx.get('type', 'transfer')
-                        if tx_type == 'zakat':
-                            st.write(f"  {j+1}. Zakat: {tx['sender']} → {tx['receiver']}: ${tx['amount']:.2f}")
-                        else:
-                            st.write(f"  {j+1}. Transfer: {tx['sender']} → {tx['receiver']}: ${tx['amount']:.2f}")
+                    for line in row['transactions']:
+                        st.write(line)
 
 def display_accounts():
     """Display all accounts and their balances"""
@@ -188,49 +278,57 @@ def display_accounts():
         st.info("No accounts created yet.")
         return
     
-    for account, account_data in st.session_state.accounts.items():
-        col1, col2, col3 = st.columns([2, 1, 1])
-        with col1:
-            if account == "Zakat_Account":
-                st.write(f"**{account}** (Special Account)")
-            else:
-                st.write(f"**{account}**")
-        with col2:
-            if isinstance(account_data, dict):
-                st.write(f"${account_data['balance']:.2f}")
-            else:
-                st.write(f"${account_data:.2f}")
-        with col3:
-            if account != "Zakat_Account" and isinstance(account_data, dict):
-                st.write(f"Roll: {account_data['roll_no']}")
-            elif account == "Zakat_Account":
-                st.write("N/A")
-            else:
-                st.write("Roll: 0000")
+    display_account_table(st.session_state.accounts)
+
+@st.cache_data(max_entries=CACHE_ENTRIES)
+def _format_history(history):
+    """Pre-format transaction history rows, cached on the history contents"""
+    rows = []
+    for tx in history:
+        rows.append({
+            'left': [
+                f"**Type:** {tx['type'].title()}",
+                f"**Sender:** {tx['sender']}",
+                f"**Receiver:** {tx['receiver']}",
+                f"**Amount:** ${tx['amount']:.2f}"
+            ],
+            'right': [
+                f"**Zakat:** ${tx['zakat_amount']:.2f}",
+                f"**Total Cost:** ${tx['total_cost']:.2f}",
+                f"**Remaining Balance:** ${tx['sender_remaining_balance']:.2f}",
+                f"**Timestamp:** {tx['timestamp_str']}"
+            ]
+        })
+    return rows
 
 def display_transaction_history():
     """Display complete transaction history"""
     st.subheader("Transaction History")
     
-    if not st.session_state.transaction_history:
+    history = st.session_state.transaction_history
+    if not history:
         st.info("No transaction history available.")
         return
     
-    for i, tx in enumerate(reversed(st.session_state.transaction_history)):
-        with st.expander(f"Transaction #{len(st.session_state.transaction_history) - i}"):
+    total = len(history)
+    # Only render one page of transactions (the latest by default) to bound the widget count
+    start, end = _page_bounds('history_offset', total)
+    display_pager('history_offset', start, end, total, "transactions")
+    
+    rows = _format_history(tuple(history[start:end]))
+    # Walk the page newest first by index; only this page's records are read
+    for idx in range(end - 1, start - 1, -1):
+        row = rows[idx - start]
+        with st.expander(f"Transaction #{idx + 1}"):
             col1, col2 = st.columns(2)
             
             with col1:
-                st.write(f"**Type:** {tx['type'].title()}")
-                st.write(f"**Sender:** {tx['sender']}")
-                st.write(f"**Receiver:** {tx['receiver']}")
-                st.write(f"**Amount:** ${tx['amount']:.2f}")
+                for line in row['left']:
+                    st.write(line)
             
             with col2:
-                st.write(f"**Zakat:** ${tx['zakat_amount']:.2f}")
-                st.write(f"**Total Cost:** ${tx['total_cost']:.2f}")
-                st.write(f"**Remaining Balance:** ${tx['sender_remaining_balance']:.2f}")
-                st.write(f"**Timestamp:** {time.ctime(tx['timestamp'])}")
+                for line in row['right']:
+                    st.write(line)
 
 def display_pending_transactions():
     """Display pending transactions waiting to be mined"""
@@ -240,12 +338,21 @@ def display_pending_transactions():
         st.info("No pending transactions.")
         return
     
-    for i, tx in enumerate(st.session_state.pending_transactions):
-        tx_type = tx.get('type', 'transfer')
-        if tx_type == 'zakat':
-            st.write(f"{i+1}. Zakat: {tx['sender']} → {tx['receiver']}: ${tx['amount']:.2f}")
-        else:
-            st.write(f"{i+1}. Transfer: {tx['sender']} → {tx['receiver']}: ${tx['amount']:.2f}")
+    rows = [
+        {
+            'Type': tx.get('type', 'transfer').title(),
+            'Sender': tx['sender'],
+            'Receiver': tx['receiver'],
+            'Amount': tx['amount']
+        }
+        for tx in st.session_state.pending_transactions
+    ]
+    st.dataframe(
+        pd.DataFrame(rows),
+        hide_index=True,
+        use_container_width=True,
+        column_config={'Amount': st.column_config.NumberColumn(format="$%.2f")}
+    )
 
 # Streamlit UI
 st.set_page_config(page_title="Zakat Blockchain Simulation", layout="wide")
@@ -289,17 +396,7 @@ elif page == "Create Account":
     
     if st.session_state.accounts:
         st.subheader("Existing Accounts")
-        for account, account_data in st.session_state.accounts.items():
-            if account == "Zakat_Account":
-                if isinstance(account_data, dict):
-                    st.write(f"• **{account}**: ${account_data['balance']:.2f} (Special Account)")
-                else:
-                    st.write(f"• **{account}**: ${account_data:.2f} (Special Account)")
-            else:
-                if isinstance(account_data, dict):
-                    st.write(f"• **{account}**: ${account_data['balance']:.2f} (Roll: {account_data['roll_no']})")
-                else:
-                    st.write(f"• **{account}**: ${account_data:.2f} (Roll: 0000)")
+        display_account_table(st.session_state.accounts)
         st.divider()
     
     with st.form("create_account_form"):
@@ -328,17 +425,7 @@ elif page == "Make Transaction":
     
     if st.session_state.accounts:
         st.subheader("Available Accounts")
-        for account, account_data in st.session_state.accounts.items():
-            if account == "Zakat_Account":
-                if isinstance(account_data, dict):
-                    st.write(f"• **{account}**: ${account_data['balance']:.2f} (Special Account)")
-                else:
-                    st.write(f"• **{account}**: ${account_data:.2f} (Special Account)")
-            else:
-                if isinstance(account_data, dict):
-                    st.write(f"• **{account}**: ${account_data['balance']:.2f} (Roll: {account_data['roll_no']})")
-                else:
-                    st.write(f"• **{account}**: ${account_data['balance']:.2f} (Roll: {account_data['roll_no']})")
+        display_account_table(st.session_state.accounts)
         st.divider()
     
     if len(st.session_state.accounts) < 2:
@@ -367,15 +454,16 @@ elif page == "Make Transaction":
                     st.error("Account name cannot be empty")
     else:
         with st.form("transaction_form"):
-            regular_accounts = [acc for acc in st.session_state.accounts.keys() if acc != "Zakat_Account"]
+            regular_accounts = _regular_accounts(tuple(st.session_state.accounts))
             sender = st.selectbox("Sender", regular_accounts)
-            receiver = st.selectbox("Receiver", [acc for acc in regular_accounts if acc != sender])
+            sender_index = regular_accounts.index(sender) if sender in regular_accounts else len(regular_accounts)
+            receiver = st.selectbox("Receiver", regular_accounts[:sender_index] + regular_accounts[sender_index + 1:])
             amount = st.number_input("Amount ($)", min_value=0.01, value=10.0, step=0.01)
             
             if sender in st.session_state.accounts:
                 sender_data = st.session_state.accounts[sender]
-                sender_balance = sender_data['balance']
-                sender_roll = sender_data['roll_no']
+                sender_balance = sender_data.balance
+                sender_roll = sender_data.roll_no
                 st.info(f"**{sender}**'s current balance: ${sender_balance:.2f} (Roll: {sender_roll})")
             
             zakat = calculate_zakat(amount)
@@ -384,7 +472,7 @@ elif page == "Make Transaction":
             
             if sender in st.session_state.accounts:
                 sender_data = st.session_state.accounts[sender]
-                sender_balance = sender_data['balance']
+                sender_balance = sender_data.balance
                 
                 if sender_balance < total_cost:
                     st.error(f"Insufficient balance! {sender} needs ${total_cost:.2f} but has ${sender_balance:.2f}")
@@ -1,6 +1,74 @@
 import hashlib
+import struct
 import time
-import json
+import types
+
+import orjson
+
+_TIMESTAMP = struct.Struct('<d')  # Block timestamp as it appears in the hashed header
+
+
+def _canonical_encode(value):
+    """
+    Encode transactions into canonical JSON bytes for hashing
+    Keys are sorted and separators compact so equal data always encodes the same
+    Always uses orjson: other encoders format some floats differently and would change block hashes
+    """
+    return orjson.dumps(value, default=dict, option=orjson.OPT_SORT_KEYS)
+
+
+def _freeze_transactions(transactions):
+    """
+    Convert a list of transaction dicts into a tuple of read-only mappings
+    """
+    if isinstance(transactions, list):
+        return tuple(
+            types.MappingProxyType(dict(tx)) if isinstance(tx, dict) else tx
+            for tx in transactions
+        )
+    return transactions
+
+
+# Prefixes that keep leaf and inner node hashes apart
+_LEAF = b'\x00'
+_NODE = b'\x01'
+
+
+def tx_hash(tx):
+    """
+    Hash a single transaction into a Merkle tree leaf
+    """
+    return hashlib.sha256(_LEAF + _canonical_encode(tx)).digest()
+
+
+def merkle_root(tx_hashes):
+    """
+    Compute the Merkle root of a list of transaction hashes
+    Pairs are hashed up to a single root; the last node of an odd-sized level is promoted unchanged
+    Nodes are never duplicated, so no two transaction lists share a root
+    """
+    if not tx_hashes:
+        return hashlib.sha256(b'').digest()
+
+    level = list(tx_hashes)
+    while len(level) > 1:
+        paired = [hashlib.sha256(_NODE + level[i] + level[i + 1]).digest() for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            paired.append(level[-1])
+        level = paired
+
+    return level[0]
+
+
+def _merkle_root(transactions):
+    """
+    Compute the Merkle root of a block's transactions
+    """
+    if isinstance(transactions, (list, tuple)):
+        return merkle_root([tx_hash(tx) for tx in transactions])
+    # Non-list content (e.g. the genesis block) is hashed as a single leaf
+    return merkle_root([tx_hash(transactions)])
+
 
 class Block:
     """
@@ -8,50 +76,125 @@ class Block:
     Each block contains transactions, hash, previous hash, timestamp, and roll number seed key
     """
     def __init__(self, transactions, prev_hash, roll_no):
+        # Freeze transactions so the block cannot be changed after its hash is computed
+        transactions = _freeze_transactions(transactions)
         self.transactions = transactions
         self.timestamp = time.time()
+        self.timestamp_str = time.ctime(self.timestamp)  # Formatted once for display
         self.roll_no = roll_no  # Student roll number as seed key
         self.prev_hash = prev_hash
-        self.hash = self.compute_hash()   # Generate hash immediately
+        self.tx_root = _merkle_root(transactions)  # Commits to all transactions
+        self.hash_bytes = self.compute_digest()   # Generate hash immediately
+        self._hash_hex = None   # Hex form of hash_bytes, built on first access
+        self._verified_fields = None   # Hashed fields as of the last successful verification
 
-    def compute_hash(self):
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuild a block from its to_dict form without recomputing any hashes
+        The block is left unverified, so the next chain validation re-hashes it
+        Raises ValueError if a field is missing or has the wrong type
+        """
+        block = cls.__new__(cls)
+        try:
+            block.transactions = _freeze_transactions(data['transactions'])
+            block.timestamp = data['timestamp']
+            block.timestamp_str = time.ctime(block.timestamp)
+            block.roll_no = data['roll_no']
+            block.prev_hash = data['prev_hash']
+            block.tx_root = bytes.fromhex(data['tx_root'])
+            block.hash = data['hash']
+        except KeyError as e:
+            raise ValueError(f"Block record is missing field {e}") from e
+        except TypeError as e:
+            raise ValueError(f"Block record has a field of the wrong type: {e}") from e
+        
+        if not isinstance(block.roll_no, str) or not isinstance(block.prev_hash, str):
+            raise ValueError("Block record roll_no and prev_hash must be strings")
+        block._verified_fields = None
+        return block
+
+    def _plain_transactions(self):
+        """
+        Get the block's transactions as a list of plain dicts
+        """
+        if isinstance(self.transactions, tuple):
+            return [dict(tx) for tx in self.transactions]
+        return self.transactions
+
+    def __hash__(self):
+        return hash(self.hash_bytes)
+
+    @property
+    def hash(self):
+        """
+        Hex string form of the block hash, used for display and hash links
+        """
+        if self._hash_hex is None:
+            self._hash_hex = self.hash_bytes.hex()
+        return self._hash_hex
+
+    @hash.setter
+    def hash(self, value):
+        self.hash_bytes = bytes.fromhex(value)
+        self._hash_hex = value
+
+    def compute_digest(self):
         """
         Compute SHA-256 hash of block contents using roll number as seed key
         This ensures uniqueness and prevents hash collisions across multiple students
         """
-        # Create a structured block data for hashing
-        block_data = {
-            'transactions': self.transactions,
-            'timestamp': self.timestamp,
-            'roll_no': self.roll_no,  # Seed key for uniqueness
-            'prev_hash': self.prev_hash
-        }
-        
-        # Convert to JSON string for consistent hashing
-        block_string = json.dumps(block_data, sort_keys=True)
-        
-        # Use roll number as additional seed in hash computation
-        # This ensures even similar blocks from different students have unique hashes
-        seed_string = f"{block_string}_{self.roll_no}"
-        
-        return hashlib.sha256(seed_string.encode()).hexdigest()
+        # Hash the header only; transactions are covered by the Merkle root
+        header = b''.join((
+            self.prev_hash.encode(),
+            _TIMESTAMP.pack(self.timestamp),
+            self.roll_no.encode(),  # Seed key for uniqueness
+            self.tx_root
+        ))
+        return hashlib.sha256(header).digest()
+
+    def compute_hash(self):
+        """
+        Compute the block hash as a hex string
+        """
+        return self.compute_digest().hex()
 
     def to_dict(self):
         """
         Convert block to dictionary for serialization
         """
         return {
-            'transactions': self.transactions,
+            'transactions': self._plain_transactions(),
             'timestamp': self.timestamp,
             'roll_no': self.roll_no,
             'prev_hash': self.prev_hash,
+            'tx_root': self.tx_root.hex(),
             'hash': self.hash
         }
 
-    def verify_integrity(self):
+    def _hashed_fields(self):
+        """
+        Get every field that goes into the block hash
+        """
+        return (self.transactions, self.prev_hash, self.timestamp, self.roll_no, self.tx_root, self.hash_bytes)
+
+    def verify_integrity(self, force=False):
         """
         Verify that the block's hash matches its computed hash
         This ensures immutability - any change to block data will invalidate the hash
+        A block is only re-hashed if a field changed since it was last verified, or if force is set
         """
-        computed_hash = self.compute_hash()
-        return self.hash == computed_hash
+        fields = self._hashed_fields()
+        # Unchanged fields compare by identity, so this check costs no hashing
+        if not force and self._verified_fields == fields:
+            return True
+
+        # Transactions must still match the root committed to by the hash
+        if _merkle_root(self.transactions) != self.tx_root:
+            return False
+
+        if self.hash_bytes != self.compute_digest():
+            return False
+
+        self._verified_fields = fields
+        return True
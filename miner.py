@@ -1,16 +1,109 @@
+import os
+from collections.abc import Mapping
+
+import orjson
+
+from account import Account
 from block import Block
+from transaction import ZAKAT_RATE
+
+# Fields every transaction in a mined block must have
+TX_FIELDS = ('sender', 'receiver', 'amount', 'type')
+
 
 class Blockchain:
     """
     Blockchain class for Zakat Blockchain Simulation
     Manages the chain of blocks with roll number-based hashing and immutability verification
     """
-    def __init__(self, roll_no="0000"):
+    def __init__(self, roll_no="0000", storage_path=None):
+        # Appending a new genesis block to a saved chain would corrupt the file
+        if storage_path is not None and os.path.exists(storage_path) and os.path.getsize(storage_path) > 0:
+            raise ValueError(f"{storage_path} already holds a chain; use Blockchain.open or Blockchain.load")
+        self._reset_state(storage_path)
+        self.create_genesis_block(roll_no)
+
+    def _reset_state(self, storage_path):
+        """
+        Initialize an empty chain and all state derived from it
+        """
         self.chain = []
         self.accounts = {}  # Track all accounts and their current balances
         # Initialize Zakat Account with proper structure
-        self.accounts["Zakat_Account"] = {'balance': 0.0, 'roll_no': '0000'}
-        self.create_genesis_block(roll_no)
+        self.accounts["Zakat_Account"] = Account(0.0, '0000')
+        # Running balances derived from chain history, updated per added block
+        self.balances = {"Zakat_Account": 0.0}
+        # Roll numbers of all blocks in the chain
+        self._roll_nos = set()
+        # Flattened transactions of all blocks, in chain order
+        self._all_txs = []
+        # Append-only file each new block is written to, if any
+        self.storage_path = storage_path
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a blockchain saved by a previous run from its storage file
+        Each block must link to the one before it; a forked, edited or malformed file raises ValueError
+        Block hashes are trusted from disk until the chain is next validated
+        New blocks keep being appended to the same file
+        """
+        blockchain = cls.__new__(cls)
+        blockchain._reset_state(path)
+        prev_hash = "0"
+        
+        with open(path, 'rb') as f:
+            for line_no, line in enumerate(f, 1):
+                try:
+                    block = Block.from_dict(orjson.loads(line))
+                    if block.prev_hash != prev_hash:
+                        raise ValueError("block does not link to the block before it")
+                    # Every block after the genesis block must hold complete transactions
+                    if blockchain.chain and not (
+                        isinstance(block.transactions, tuple)
+                        and all(isinstance(tx, Mapping) and all(field in tx for field in TX_FIELDS)
+                                for tx in block.transactions)
+                    ):
+                        raise ValueError("block transactions are missing fields")
+                    blockchain._append_block(block)
+                except (KeyError, TypeError, ValueError) as e:
+                    raise ValueError(f"{path} line {line_no}: {e}") from e
+                prev_hash = block.hash
+        
+        if not blockchain.chain:
+            raise ValueError(f"{path} holds no blocks")
+        return blockchain
+
+    @classmethod
+    def open(cls, path, roll_no="0000"):
+        """
+        Load the blockchain saved at path, or start a new one there if the file is missing or empty
+        """
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            return cls.load(path)
+        return cls(roll_no, storage_path=path)
+
+    def _append_block(self, block):
+        """
+        Append a block to the chain and update all state derived from it
+        """
+        is_genesis = not self.chain
+        self.chain.append(block)
+        self._roll_nos.add(block.roll_no)
+        # Every block after the genesis block holds a tuple of transaction mappings
+        if not is_genesis:
+            # Update account balances based on the new block's transactions
+            self.update_account_balances_from_block(block)
+            self._all_txs.extend(block.transactions)
+
+    def _save_block(self, block):
+        """
+        Append a single block to the storage file as one line of JSON
+        """
+        if self.storage_path is None:
+            return
+        with open(self.storage_path, 'ab') as f:
+            f.write(orjson.dumps(block.to_dict()) + b'\n')
 
     def create_genesis_block(self, roll_no):
         """
@@ -18,7 +111,8 @@ class Blockchain:
         This is the foundation of the blockchain
         """
         genesis_block = Block(transactions="Genesis Block", prev_hash="0", roll_no=roll_no)
-        self.chain.append(genesis_block)
+        self._append_block(genesis_block)
+        self._save_block(genesis_block)
 
     def add_block(self, transactions, roll_no):
         """
@@ -28,14 +122,20 @@ class Blockchain:
         if not self.chain:
             return False
         
+        # Only lists of complete transaction dicts can be mined
+        if not isinstance(transactions, list):
+            return False
+        for tx in transactions:
+            if not isinstance(tx, dict) or any(field not in tx for field in TX_FIELDS):
+                return False
+        
         prev_block = self.chain[-1]
         new_block = Block(transactions=transactions, prev_hash=prev_block.hash, roll_no=roll_no)
 
         # Verify the new block's integrity before adding
         if new_block.verify_integrity() and new_block.prev_hash == prev_block.hash:
-            self.chain.append(new_block)
-            # Update account balances based on the new block's transactions
-            self.update_account_balances_from_block(new_block)
+            self._append_block(new_block)
+            self._save_block(new_block)
             return True
         return False
 
@@ -44,78 +144,78 @@ class Blockchain:
         Update account balances based on transactions in a block
         This maintains the current state of all accounts
         """
-        if isinstance(block.transactions, list):
-            for tx in block.transactions:
-                if isinstance(tx, dict):
-                    sender = tx.get('sender')
-                    receiver = tx.get('receiver')
-                    amount = tx.get('amount', 0)
-                    
-                    if sender and receiver and amount > 0:
-                        # Initialize accounts if they don't exist
-                        if sender not in self.accounts:
-                            self.accounts[sender] = {'balance': 200.0, 'roll_no': '0000'}
-                        if receiver not in self.accounts:
-                            self.accounts[receiver] = {'balance': 200.0, 'roll_no': '0000'}
-                        
-                        # Handle different account data structures
-                        if isinstance(self.accounts[sender], dict):
-                            self.accounts[sender]['balance'] -= amount
-                        else:
-                            # Convert float to dict structure
-                            self.accounts[sender] = {'balance': self.accounts[sender] - amount, 'roll_no': '0000'}
-                        
-                        if isinstance(self.accounts[receiver], dict):
-                            self.accounts[receiver]['balance'] += amount
-                        else:
-                            # Convert float to dict structure
-                            self.accounts[receiver] = {'balance': self.accounts[receiver] + amount, 'roll_no': '0000'}
+        for tx in block.transactions:
+            sender = tx['sender']
+            receiver = tx['receiver']
+            amount = tx['amount']
+            
+            if sender and receiver and amount > 0:
+                self.apply_transaction_to_balances(self.balances, tx)
+
+                # Initialize accounts if they don't exist
+                if sender not in self.accounts:
+                    self.accounts[sender] = Account(200.0, '0000')
+                if receiver not in self.accounts:
+                    self.accounts[receiver] = Account(200.0, '0000')
+                
+                self.accounts[sender].balance -= amount
+                self.accounts[receiver].balance += amount
 
     def get_all_accounts(self):
         """
         Get all accounts and their current balances from blockchain state
+        Every account is stored as an Account record
+        """
+        return dict(self.accounts)
+
+    @staticmethod
+    def initial_balance(account_name):
+        """
+        Starting balance of an account before any chain activity
+        Student accounts start with 200 coins, the Zakat Account with nothing
         """
-        # Ensure all accounts are in the proper format
-        formatted_accounts = {}
-        for account_name, account_data in self.accounts.items():
-            if isinstance(account_data, dict):
-                formatted_accounts[account_name] = account_data
-            else:
-                # Convert float to dict structure
-                formatted_accounts[account_name] = {'balance': account_data, 'roll_no': '0000'}
-        return formatted_accounts
+        return 0.0 if account_name == "Zakat_Account" else 200.0
+
+    def apply_transaction_to_balances(self, balances, tx):
+        """
+        Apply a single chain transaction to a balances dictionary
+        """
+        sender = tx['sender']
+        receiver = tx['receiver']
+        amount = tx['amount']
+        tx_type = tx['type']
+
+        if sender not in balances:
+            balances[sender] = self.initial_balance(sender)
+        if receiver not in balances:
+            balances[receiver] = self.initial_balance(receiver)
+
+        # Subtract the amount sent; zakat on a transfer is its own 'zakat' transaction
+        if tx_type == 'transfer' or tx_type == 'zakat':
+            balances[sender] -= amount
+
+        # Add the amount received
+        balances[receiver] += amount
+
+    def recompute_balances(self):
+        """
+        Rebuild all account balances by replaying the entire blockchain history
+        Used for integrity audits of the incrementally maintained balances
+        """
+        balances = {"Zakat_Account": 0.0}
+        # Skip the genesis block, which holds no transactions
+        for block in self.chain[1:]:
+            for tx in block.transactions:
+                if tx['sender'] and tx['receiver'] and tx['amount'] > 0:
+                    self.apply_transaction_to_balances(balances, tx)
+        return balances
 
     def calculate_account_balance_from_history(self, account_name):
         """
-        Calculate account balance from the entire blockchain history
+        Get account balance as derived from the entire blockchain history
         This is the authoritative way to determine current balance
         """
-        balance = 0.0
-        
-        # Start with initial balance (200 coins for student accounts)
-        if account_name != "Zakat_Account":
-            balance = 200.0
-        
-        # Process all transactions in the blockchain
-        for block in self.chain:
-            if isinstance(block.transactions, list):
-                for tx in block.transactions:
-                    if isinstance(tx, dict):
-                        if tx.get('sender') == account_name:
-                            # Subtract the amount sent
-                            if tx.get('type') == 'transfer':
-                                balance -= tx.get('amount', 0)
-                                # Also subtract zakat amount
-                                zakat_amount = tx.get('amount', 0) * 0.025
-                                balance -= zakat_amount
-                            elif tx.get('type') == 'zakat':
-                                balance -= tx.get('amount', 0)
-                        
-                        if tx.get('receiver') == account_name:
-                            # Add the amount received
-                            balance += tx.get('amount', 0)
-        
-        return balance
+        return self.balances.get(account_name, self.initial_balance(account_name))
 
     def validate_transaction_against_blockchain(self, sender, receiver, amount):
         """
@@ -125,7 +225,7 @@ class Blockchain:
         sender_balance = self.calculate_account_balance_from_history(sender)
         
         # Calculate zakat amount
-        zakat_amount = amount * 0.025
+        zakat_amount = amount * ZAKAT_RATE
         total_amount = amount + zakat_amount
         
         # Check if sender has sufficient balance
@@ -134,10 +234,67 @@ class Blockchain:
         
         return True, "Transaction is valid"
 
-    def is_valid(self):
+    def snapshot_balances(self):
+        """
+        Get a copy of all account balances derived from the blockchain history
+        """
+        return dict(self.balances)
+
+    def validate_batch(self, transactions, accounts=None):
+        """
+        Validate a batch of (sender, receiver, amount) transactions against the blockchain state
+        Each transaction is checked against the balances left by the ones before it
+        If accounts is given, both parties must also be existing accounts
+        Returns whether all are valid and one (valid, message) result per transaction
+        """
+        balances = self.snapshot_balances()
+        # The set of accounts does not change within a batch
+        known = None if accounts is None else frozenset(accounts)
+        all_valid = True
+        results = []
+        
+        for sender, receiver, amount in transactions:
+            # Rejected entries never touch the snapshot, so later results are unaffected
+            if amount <= 0:
+                all_valid = False
+                results.append((False, "Amount must be positive"))
+                continue
+            if sender == receiver:
+                all_valid = False
+                results.append((False, "Sender and receiver cannot be the same"))
+                continue
+            
+            if known is not None:
+                if sender not in known:
+                    all_valid = False
+                    results.append((False, f"Sender account '{sender}' does not exist."))
+                    continue
+                if receiver not in known:
+                    all_valid = False
+                    results.append((False, f"Receiver account '{receiver}' does not exist."))
+                    continue
+            
+            sender_balance = balances.get(sender, self.initial_balance(sender))
+            zakat_amount = amount * ZAKAT_RATE
+            total_amount = amount + zakat_amount
+            
+            if sender_balance < total_amount:
+                all_valid = False
+                results.append((False, f"Insufficient balance. {sender} has ${sender_balance:.2f} but needs ${total_amount:.2f}"))
+                continue
+            
+            balances[sender] = sender_balance - total_amount
+            balances[receiver] = balances.get(receiver, self.initial_balance(receiver)) + amount
+            balances["Zakat_Account"] = balances.get("Zakat_Account", 0.0) + zakat_amount
+            results.append((True, "Transaction is valid"))
+        
+        return all_valid, results
+
+    def is_valid(self, full=False):
         """
         Validate the entire blockchain by checking hashes and integrity
         Ensures immutability - any tampering will be detected
+        Blocks unchanged since their last check are not re-hashed unless full is set
         """
         if len(self.chain) == 0:
             return False
@@ -146,7 +303,7 @@ class Blockchain:
             current = self.chain[i]
             
             # Verify each block's integrity
-            if not current.verify_integrity():
+            if not current.verify_integrity(force=full):
                 return False
             
             # Check hash links (except for genesis block)
@@ -181,13 +338,9 @@ class Blockchain:
 
     def get_transaction_history(self):
         """
-        Get all transactions from all blocks in the chain
+        Get all transactions from all blocks in the chain as plain dicts
         """
-        transactions = []
-        for block in self.chain:
-            if isinstance(block.transactions, list):
-                transactions.extend(block.transactions)
-        return transactions
+        return [dict(tx) for tx in self._all_txs]
 
     def verify_block_integrity(self, block_index):
         """
@@ -201,7 +354,4 @@ class Blockchain:
         """
         Get all roll numbers used in the blockchain
         """
-        roll_numbers = set()
-        for block in self.chain:
-            roll_numbers.add(block.roll_no)
-        return list(roll_numbers)
+        return list(self._roll_nos)
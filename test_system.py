@@ -4,256 +4,347 @@ Test Script for Zakat Blockchain Simulation
 Verifies that all requirements are met and the system works correctly
 """
 
+import json
+import os
+import sys
+import tempfile
 import time
-from transaction import Transaction
+from transaction import Transaction, ZAKAT_RATE
+from account import Account
+from block import Block
 from miner import Blockchain
 
+# Column order of the transaction history records
+TX_COLS = ('timestamp', 'sender', 'receiver', 'amount', 'zakat_amount', 'total_cost', 'sender_remaining_balance', 'type')
+
 def test_zakat_blockchain_system():
     """
     Comprehensive test of the Zakat Blockchain Simulation
     """
-    print("Testing Zakat Blockchain Simulation")
-    print("=" * 50)
-    
-    # Initialize blockchain
-    blockchain = Blockchain()
-    accounts = {}
-    transaction_history = []
-    
-    # Initialize Zakat Account
-    accounts["Zakat_Account"] = {'balance': 0.0, 'roll_no': '0000'}
-    
-    print("1. Blockchain initialized successfully")
-    
-    # Test 1: Create student accounts with 200 coins default
-    print("\nTest 1: Creating student accounts with 200 coins default")
-    
-    # Create accounts with roll numbers
-    accounts["Alice"] = {
-        'balance': 200.0,
-        'roll_no': '2023001',
-        'created_at': time.time()
-    }
-    accounts["Bob"] = {
-        'balance': 200.0,
-        'roll_no': '2023002',
-        'created_at': time.time()
-    }
-    accounts["Charlie"] = {
-        'balance': 200.0,
-        'roll_no': '2023003',
-        'created_at': time.time()
-    }
-    
-    print(f"Created 3 student accounts with 200 coins each")
-    print(f"   - Alice (Roll: 2023001): ${accounts['Alice']['balance']:.2f}")
-    print(f"   - Bob (Roll: 2023002): ${accounts['Bob']['balance']:.2f}")
-    print(f"   - Charlie (Roll: 2023003): ${accounts['Charlie']['balance']:.2f}")
-    
-    # Test 2: Zakat calculation (2.5%)
-    print("\nTest 2: Zakat calculation (2.5%)")
-    
-    def calculate_zakat(amount):
-        return amount * 0.025
-    
-    test_amount = 100.0
-    zakat_amount = calculate_zakat(test_amount)
-    print(f"Zakat calculation: ${test_amount:.2f} → ${zakat_amount:.2f} (2.5%)")
-    
-    # Test 3: Perform transactions with zakat deduction
-    print("\nTest 3: Performing transactions with zakat deduction")
-    
-    # Add accounts to blockchain state
-    blockchain.accounts["Alice"] = {'balance': 200.0, 'roll_no': '2023001'}
-    blockchain.accounts["Bob"] = {'balance': 200.0, 'roll_no': '2023002'}
-    blockchain.accounts["Charlie"] = {'balance': 200.0, 'roll_no': '2023003'}
-    blockchain.accounts["Zakat_Account"] = {'balance': 0.0, 'roll_no': '0000'}
-    
-    # Transaction 1: Alice to Bob
-    amount1 = 50.0
-    zakat1 = calculate_zakat(amount1)
-    total1 = amount1 + zakat1
-    
-    # Validate against blockchain first
-    success, message = blockchain.validate_transaction_against_blockchain("Alice", "Bob", amount1)
-    if success:
-        # Update balances
-        accounts["Alice"]['balance'] -= total1
-        accounts["Bob"]['balance'] += amount1
-        accounts["Zakat_Account"]['balance'] += zakat1
-        
-        # Record transaction
-        transaction_record = {
-            'timestamp': time.time(),
-            'sender': 'Alice',
-            'receiver': 'Bob',
-            'amount': amount1,
-            'zakat_amount': zakat1,
-            'total_cost': total1,
-            'sender_remaining_balance': accounts["Alice"]['balance'],
-            'type': 'transfer'
-        }
-        transaction_history.append(transaction_record)
-        
-        print(f"Transaction 1: Alice → Bob: ${amount1:.2f} (Zakat: ${zakat1:.2f})")
-        print(f"   Alice balance: ${accounts['Alice']['balance']:.2f}")
-        print(f"   Bob balance: ${accounts['Bob']['balance']:.2f}")
-        print(f"   Zakat Account: ${accounts['Zakat_Account']['balance']:.2f}")
-    
-    # Transaction 2: Bob to Charlie
-    amount2 = 30.0
-    zakat2 = calculate_zakat(amount2)
-    total2 = amount2 + zakat2
-    
-    # Validate against blockchain first
-    success, message = blockchain.validate_transaction_against_blockchain("Bob", "Charlie", amount2)
-    if success:
-        # Update balances
-        accounts["Bob"]['balance'] -= total2
-        accounts["Charlie"]['balance'] += amount2
-        accounts["Zakat_Account"]['balance'] += zakat2
-        
-        # Record transaction
-        transaction_record = {
-            'timestamp': time.time(),
-            'sender': 'Bob',
-            'receiver': 'Charlie',
-            'amount': amount2,
-            'zakat_amount': zakat2,
-            'total_cost': total2,
-            'sender_remaining_balance': accounts["Bob"]['balance'],
-            'type': 'transfer'
-        }
-        transaction_history.append(transaction_record)
-        
-        print(f"Transaction 2: Bob → Charlie: ${amount2:.2f} (Zakat: ${zakat2:.2f})")
-        print(f"   Bob balance: ${accounts['Bob']['balance']:.2f}")
-        print(f"   Charlie balance: ${accounts['Charlie']['balance']:.2f}")
-        print(f"   Zakat Account: ${accounts['Zakat_Account']['balance']:.2f}")
-    
-    # Test 4: Create blocks with roll number seed keys
-    print("\nTest 4: Creating blocks with roll number seed keys")
-    
-    # Create pending transactions for mining
-    pending_transactions = [
-        {
-            'sender': 'Alice',
-            'receiver': 'Bob',
-            'amount': amount1,
-            'type': 'transfer',
-            'timestamp': time.time()
-        },
-        {
-            'sender': 'Alice',
-            'receiver': 'Zakat_Account',
-            'amount': zakat1,
-            'type': 'zakat',
-            'timestamp': time.time()
-        },
-        {
-            'sender': 'Bob',
-            'receiver': 'Charlie',
-            'amount': amount2,
-            'type': 'transfer',
-            'timestamp': time.time()
-        },
-        {
-            'sender': 'Bob',
-            'receiver': 'Zakat_Account',
-            'amount': zakat2,
-            'type': 'zakat',
-            'timestamp': time.time()
-        }
-    ]
-    
-    # Mine blocks using different roll numbers
-    roll_numbers = ['22f3722', '22f3704', '22f3714']
-    
-    for i, roll_no in enumerate(roll_numbers):
-        # Take first 2 transactions for each block
-        block_transactions = pending_transactions[i*2:(i+1)*2] if i*2 < len(pending_transactions) else []
-        
-        if block_transactions:
-            success = blockchain.add_block(block_transactions, roll_no)
-            if success:
-                print(f"Block {i+1} mined with roll number {roll_no}")
-            else:
-                print(f"Failed to mine block {i+1}")
-    
-    # Test 5: Blockchain validation
-    print("\nTest 5: Blockchain validation and immutability")
-    
-    is_valid = blockchain.is_valid()
-    if is_valid:
-        print("Blockchain is valid - all blocks are properly linked")
-    else:
-        print("Blockchain is invalid - integrity check failed")
-    
-    print(f"Chain length: {len(blockchain.chain)} blocks")
-    
-    # Test 6: Show transaction history
-    print("\nTest 6: Transaction history maintenance")
-    
-    print(f"Total transactions recorded: {len(transaction_history)}")
-    for i, tx in enumerate(transaction_history):
-        print(f"   Transaction {i+1}: {tx['sender']} → {tx['receiver']}: ${tx['amount']:.2f} (Zakat: ${tx['zakat_amount']:.2f})")
-    
-    # Test 7: Roll number uniqueness in hashing
-    print("\nTest 7: Roll number uniqueness in hashing")
-    
-    roll_numbers_used = blockchain.get_roll_numbers_used()
-    print(f"Roll numbers used in blockchain: {roll_numbers_used}")
-    
-    if len(set(roll_numbers_used)) == len(roll_numbers_used):
-        print("All roll numbers are unique")
-    else:
-        print("Duplicate roll numbers detected")
-    
-    # Test 8: Blockchain-based balance calculation
-    print("\nTest 8: Blockchain-based balance calculation")
-    
-    alice_balance = blockchain.calculate_account_balance_from_history("Alice")
-    bob_balance = blockchain.calculate_account_balance_from_history("Bob")
-    charlie_balance = blockchain.calculate_account_balance_from_history("Charlie")
-    zakat_balance = blockchain.calculate_account_balance_from_history("Zakat_Account")
-    
-    print(f"Alice balance from blockchain: ${alice_balance:.2f}")
-    print(f"Bob balance from blockchain: ${bob_balance:.2f}")
-    print(f"Charlie balance from blockchain: ${charlie_balance:.2f}")
-    print(f"Zakat Account balance from blockchain: ${zakat_balance:.2f}")
-    
-    # Test 9: Transaction validation against blockchain
-    print("\nTest 9: Transaction validation against blockchain")
-    
-    # Test valid transaction
-    success, message = blockchain.validate_transaction_against_blockchain("Alice", "Bob", 10.0)
-    print(f"Valid transaction test: {message}")
-    
-    # Test invalid transaction (insufficient balance)
-    success, message = blockchain.validate_transaction_against_blockchain("Alice", "Bob", 200.0)
-    print(f"Invalid transaction test: {message}")
-    
-    # Test 10: Final account balances
-    print("\nTest 10: Final account balances")
-    
-    for account, account_data in accounts.items():
-        if account == "Zakat_Account":
-            print(f"   {account}: ${account_data['balance']:.2f} (Special Account)")
+    # Collect output lines and write them in one go at the end,
+    # even when a check fails part way through
+    out = []
+    try:
+        out.append("Testing Zakat Blockchain Simulation")
+        out.append("=" * 50)
+        
+        # Initialize blockchain
+        blockchain = Blockchain()
+        accounts = {}
+        transaction_history = []
+        
+        # Initialize Zakat Account
+        accounts["Zakat_Account"] = Account(0.0, '0000')
+        
+        out.append("1. Blockchain initialized successfully")
+        
+        # Test 1: Create student accounts with 200 coins default
+        out.append("\nTest 1: Creating student accounts with 200 coins default")
+        
+        # Create accounts with roll numbers
+        now = time.time()
+        accounts["Alice"] = Account(200.0, '2023001', now)
+        accounts["Bob"] = Account(200.0, '2023002', now)
+        accounts["Charlie"] = Account(200.0, '2023003', now)
+        
+        out.append(f"Created 3 student accounts with 200 coins each")
+        out.append(f"   - Alice (Roll: 2023001): ${accounts['Alice'].balance:.2f}")
+        out.append(f"   - Bob (Roll: 2023002): ${accounts['Bob'].balance:.2f}")
+        out.append(f"   - Charlie (Roll: 2023003): ${accounts['Charlie'].balance:.2f}")
+        
+        # Test 2: Zakat calculation (2.5%)
+        out.append("\nTest 2: Zakat calculation (2.5%)")
+        
+        def calculate_zakat(amount):
+            return amount * ZAKAT_RATE
+        
+        test_amount = 100.0
+        zakat_amount = calculate_zakat(test_amount)
+        out.append(f"Zakat calculation: ${test_amount:.2f} → ${zakat_amount:.2f} (2.5%)")
+        
+        # Test 3: Perform transactions with zakat deduction
+        out.append("\nTest 3: Performing transactions with zakat deduction")
+        
+        # Add accounts to blockchain state
+        blockchain.accounts["Alice"] = Account(200.0, '2023001')
+        blockchain.accounts["Bob"] = Account(200.0, '2023002')
+        blockchain.accounts["Charlie"] = Account(200.0, '2023003')
+        blockchain.accounts["Zakat_Account"] = Account(0.0, '0000')
+        
+        amount1 = 50.0
+        zakat1 = calculate_zakat(amount1)
+        total1 = amount1 + zakat1
+        
+        amount2 = 30.0
+        zakat2 = calculate_zakat(amount2)
+        total2 = amount2 + zakat2
+        
+        # Validate the whole batch against blockchain first
+        _, results = blockchain.validate_batch([
+            ("Alice", "Bob", amount1),
+            ("Bob", "Charlie", amount2)
+        ], accounts)
+        
+        (valid1, message1), (valid2, message2) = results
+
+        # Non-positive and self transfers fail without crediting the snapshot for later entries
+        _, checked = blockchain.validate_batch([
+            ("Alice", "Bob", -100.0),
+            ("Alice", "Alice", 10.0),
+            ("Alice", "Bob", 300.0)
+        ], accounts)
+        assert [valid for valid, _ in checked] == [False, False, False]
+        out.append("Invalid batch entries are rejected without affecting later entries")
+        
+        # Transaction 1: Alice to Bob
+        if valid1:
+            # Update balances
+            accounts["Alice"].balance -= total1
+            accounts["Bob"].balance += amount1
+            accounts["Zakat_Account"].balance += zakat1
+        
+            # Record transaction
+            transaction_history.append(
+                (time.time(), 'Alice', 'Bob', amount1, zakat1, total1, accounts["Alice"].balance, 'transfer')
+            )
+        
+            out.append(f"Transaction 1: Alice → Bob: ${amount1:.2f} (Zakat: ${zakat1:.2f})")
+            out.append(f"   Alice balance: ${accounts['Alice'].balance:.2f}")
+            out.append(f"   Bob balance: ${accounts['Bob'].balance:.2f}")
+            out.append(f"   Zakat Account: ${accounts['Zakat_Account'].balance:.2f}")
         else:
-            print(f"   {account}: ${account_data['balance']:.2f} (Roll: {account_data['roll_no']})")
-    
-    # Summary
-    print("\n" + "=" * 50)
-    print("ALL TESTS COMPLETED SUCCESSFULLY!")
-    print("=" * 50)
-    print("Default 200 coins balance for student nodes")
-    print("2.5% zakat calculation and deduction")
-    print("Roll number seed key in hashing")
-    print("Complete transaction history")
-    print("Block validation and immutability")
-    print("Modular code structure")
-    print("Comprehensive documentation")
-    print("Efficient execution without errors")
+            out.append(f"Transaction 1 failed: {message1}")
+        
+        # Transaction 2: Bob to Charlie
+        if valid2:
+            # Update balances
+            accounts["Bob"].balance -= total2
+            accounts["Charlie"].balance += amount2
+            accounts["Zakat_Account"].balance += zakat2
+        
+            # Record transaction
+            transaction_history.append(
+                (time.time(), 'Bob', 'Charlie', amount2, zakat2, total2, accounts["Bob"].balance, 'transfer')
+            )
+        
+            out.append(f"Transaction 2: Bob → Charlie: ${amount2:.2f} (Zakat: ${zakat2:.2f})")
+            out.append(f"   Bob balance: ${accounts['Bob'].balance:.2f}")
+            out.append(f"   Charlie balance: ${accounts['Charlie'].balance:.2f}")
+            out.append(f"   Zakat Account: ${accounts['Zakat_Account'].balance:.2f}")
+        else:
+            out.append(f"Transaction 2 failed: {message2}")
+        
+        # Test 4: Create blocks with roll number seed keys
+        out.append("\nTest 4: Creating blocks with roll number seed keys")
+        
+        # Create pending transactions for mining
+        now = time.time()
+        pending_transactions = [
+            {
+                'sender': 'Alice',
+                'receiver': 'Bob',
+                'amount': amount1,
+                'zakat_amount': zakat1,
+                'type': 'transfer',
+                'timestamp': now
+            },
+            {
+                'sender': 'Alice',
+                'receiver': 'Zakat_Account',
+                'amount': zakat1,
+                'type': 'zakat',
+                'timestamp': now
+            },
+            {
+                'sender': 'Bob',
+                'receiver': 'Charlie',
+                'amount': amount2,
+                'zakat_amount': zakat2,
+                'type': 'transfer',
+                'timestamp': now
+            },
+            {
+                'sender': 'Bob',
+                'receiver': 'Zakat_Account',
+                'amount': zakat2,
+                'type': 'zakat',
+                'timestamp': now
+            }
+        ]
+        
+        # Every transfer must be followed by the zakat entry that charges it
+        for transfer, zakat in zip(pending_transactions[::2], pending_transactions[1::2]):
+            assert transfer['type'] == 'transfer' and zakat['type'] == 'zakat'
+            assert zakat['sender'] == transfer['sender'] and zakat['amount'] == transfer['zakat_amount']
+        out.append("Every transfer has a paired zakat entry")
+        
+        # Mine blocks using different roll numbers
+        roll_numbers = ['22f3722', '22f3704', '22f3714']
+        
+        for i, roll_no in enumerate(roll_numbers):
+            # Take first 2 transactions for each block
+            block_transactions = pending_transactions[i*2:(i+1)*2] if i*2 < len(pending_transactions) else []
+        
+            if block_transactions:
+                success = blockchain.add_block(block_transactions, roll_no)
+                if success:
+                    out.append(f"Block {i+1} mined with roll number {roll_no}")
+                else:
+                    out.append(f"Failed to mine block {i+1}")
+        
+        # Test 5: Blockchain validation
+        out.append("\nTest 5: Blockchain validation and immutability")
+        
+        is_valid = blockchain.is_valid()
+        if is_valid:
+            out.append("Blockchain is valid - all blocks are properly linked")
+        else:
+            out.append("Blockchain is invalid - integrity check failed")
+        
+        out.append(f"Chain length: {len(blockchain.chain)} blocks")
+
+        # Tampering with a mined block must be detected, even after it was validated
+        original = blockchain.chain[1].transactions
+        blockchain.chain[1].transactions = original[:1]
+        tampered_valid = blockchain.is_valid()
+        blockchain.chain[1].transactions = original
+        assert not tampered_valid and blockchain.is_valid()
+        out.append("Tampering with a block's transactions invalidates the chain")
+
+        # Repeating the last transaction of an odd-sized block must change its Merkle root
+        block = Block(pending_transactions[:3], blockchain.chain[-1].hash, '22f3799')
+        block.transactions = block.transactions + block.transactions[-1:]
+        assert not block.verify_integrity(force=True)
+        out.append("Duplicating a block's last transaction invalidates the block")
+
+        # Test 6: Show transaction history
+        out.append("\nTest 6: Transaction history maintenance")
+        
+        out.append(f"Total transactions recorded: {len(transaction_history)}")
+        for i, tx in enumerate(transaction_history):
+            rec = dict(zip(TX_COLS, tx))
+            out.append(f"   Transaction {i+1}: {rec['sender']} → {rec['receiver']}: ${rec['amount']:.2f} (Zakat: ${rec['zakat_amount']:.2f})")
+        
+        # The chain's own history must serialize like the records it was mined from
+        chain_history = blockchain.get_transaction_history()
+        assert json.loads(json.dumps(chain_history)) == pending_transactions
+        out.append(f"Chain history holds {len(chain_history)} JSON-serializable transactions")
+        
+        # Test 7: Roll number uniqueness in hashing
+        out.append("\nTest 7: Roll number uniqueness in hashing")
+        
+        roll_numbers_used = blockchain.get_roll_numbers_used()
+        out.append(f"Roll numbers used in blockchain: {roll_numbers_used}")
+        
+        if len(set(roll_numbers_used)) == len(roll_numbers_used):
+            out.append("All roll numbers are unique")
+        else:
+            out.append("Duplicate roll numbers detected")
+        
+        # Test 8: Blockchain-based balance calculation
+        out.append("\nTest 8: Blockchain-based balance calculation")
+        
+        alice_balance = blockchain.calculate_account_balance_from_history("Alice")
+        bob_balance = blockchain.calculate_account_balance_from_history("Bob")
+        charlie_balance = blockchain.calculate_account_balance_from_history("Charlie")
+        zakat_balance = blockchain.calculate_account_balance_from_history("Zakat_Account")
+        
+        out.append(f"Alice balance from blockchain: ${alice_balance:.2f}")
+        out.append(f"Bob balance from blockchain: ${bob_balance:.2f}")
+        out.append(f"Charlie balance from blockchain: ${charlie_balance:.2f}")
+        out.append(f"Zakat Account balance from blockchain: ${zakat_balance:.2f}")
+        
+        if blockchain.recompute_balances() == blockchain.balances:
+            out.append("Incremental balances match full history replay")
+        else:
+            out.append("Incremental balances differ from full history replay")
+        
+        # Test 9: Transaction validation against blockchain
+        out.append("\nTest 9: Transaction validation against blockchain")
+        
+        # Test valid transaction
+        success, message = blockchain.validate_transaction_against_blockchain("Alice", "Bob", 10.0)
+        out.append(f"Valid transaction test: {message}")
+        
+        # Test invalid transaction (insufficient balance)
+        success, message = blockchain.validate_transaction_against_blockchain("Alice", "Bob", 200.0)
+        out.append(f"Invalid transaction test: {message}")
+        
+        # Test 10: Final account balances
+        out.append("\nTest 10: Final account balances")
+        
+        for account, account_data in accounts.items():
+            if account == "Zakat_Account":
+                out.append(f"   {account}: ${account_data.balance:.2f} (Special Account)")
+            else:
+                out.append(f"   {account}: ${account_data.balance:.2f} (Roll: {account_data.roll_no})")
+        
+        # Test 11: Saving and reloading the blockchain
+        out.append("\nTest 11: Saving and reloading the blockchain")
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "chain.jsonl")
+            saved = Blockchain(storage_path=path)
+            saved.add_block(pending_transactions[:2], '22f3722')
+            saved.add_block(pending_transactions[2:], '22f3704')
+        
+            loaded = Blockchain.load(path)
+            assert [block.hash for block in loaded.chain] == [block.hash for block in saved.chain]
+            assert loaded.balances == saved.balances
+            assert loaded.is_valid(full=True)
+            out.append(f"Reloaded {len(loaded.chain)} blocks with matching hashes and balances")
+        
+            # Opening an existing file loads it, while starting a new chain over it is refused
+            assert len(Blockchain.open(path).chain) == len(saved.chain)
+            try:
+                Blockchain(storage_path=path)
+                overwritten = True
+            except ValueError:
+                overwritten = False
+            assert not overwritten
+            out.append("Existing chain file is opened, never overwritten with a new genesis block")
+        
+            # Blocks added after reloading are appended to the same file
+            loaded.add_block(pending_transactions[:2], '22f3714')
+            assert len(Blockchain.load(path).chain) == 4
+        
+            # A second block extending the same parent forks the file and is refused
+            saved.add_block(pending_transactions[2:], '22f3799')
+            try:
+                Blockchain.load(path)
+                forked_loaded = True
+            except ValueError:
+                forked_loaded = False
+            assert not forked_loaded
+            out.append("Forked chain file is refused on load")
+
+            # A record with missing fields is refused the same way
+            bad_path = os.path.join(tmp, "malformed.jsonl")
+            Blockchain(storage_path=bad_path)
+            with open(bad_path, 'ab') as f:
+                f.write(b'{"transactions": []}\n')
+            try:
+                Blockchain.load(bad_path)
+                malformed_loaded = True
+            except ValueError:
+                malformed_loaded = False
+            assert not malformed_loaded
+            out.append("Malformed chain file is refused on load")
+        
+        # Summary
+        out.append("\n" + "=" * 50)
+        out.append("ALL TESTS COMPLETED SUCCESSFULLY!")
+        out.append("=" * 50)
+        out.append("Default 200 coins balance for student nodes")
+        out.append("2.5% zakat calculation and deduction")
+        out.append("Roll number seed key in hashing")
+        out.append("Complete transaction history")
+        out.append("Block validation and immutability")
+        out.append("Modular code structure")
+        out.append("Comprehensive documentation")
+        out.append("Efficient execution without errors")
+    finally:
+        sys.stdout.write("\n".join(out) + "\n")
     
 
 
@@ -1,21 +1,32 @@
 import time
 
+ZAKAT_RATE = 0.025  # Zakat charged on every transfer (2.5%)
+
 class Transaction:
     """
     Transaction class for Zakat Blockchain Simulation
     Handles financial transactions with proper validation against blockchain state
     """
-    def __init__(self, sender, receiver, amount):
+    __slots__ = ('sender', 'receiver', 'amount', 'timestamp', '_dict')
+
+    def __init__(self, sender, receiver, amount, timestamp=None):
         self.sender = sender
         self.receiver = receiver
         self.amount = amount
-        self.timestamp = time.time()
+        # Callers creating a batch of transactions can share one timestamp
+        self.timestamp = time.time() if timestamp is None else timestamp
+        # Dictionary form, built on first use
+        self._dict = None
 
-    def validate_against_blockchain(self, blockchain, accounts):
+    def validate_against_blockchain(self, blockchain, accounts, known=None):
         """
         Validate transaction against the entire blockchain state
         This ensures the sender has sufficient balance based on all previous transactions
+        Batch callers can pass known, a frozenset of account names shared across the batch
         """
+        if known is None:
+            known = accounts
+        
         # Calculate current balance from blockchain history
         sender_balance = self.calculate_balance_from_blockchain(blockchain, self.sender)
         
@@ -24,10 +35,10 @@ class Transaction:
             return False, f"Insufficient balance. {self.sender} has ${sender_balance:.2f} but needs ${self.amount:.2f}"
         
         # Check if both accounts exist
-        if self.sender not in accounts:
+        if self.sender not in known:
             return False, f"Sender account '{self.sender}' does not exist."
         
-        if self.receiver not in accounts:
+        if self.receiver not in known:
             return False, f"Receiver account '{self.receiver}' does not exist."
         
         # Validate amount is positive
@@ -45,84 +56,76 @@ class Transaction:
         Calculate account balance from the entire blockchain history
         This simulates how real blockchains validate transactions
         """
-        balance = 0.0
-        
-        # Start with initial balance if account exists in current accounts
-        # For student accounts, this would be 200 coins
-        if account_name in blockchain.get_all_accounts():
-            balance = blockchain.get_all_accounts()[account_name].get('balance', 0.0)
-        
-        # Process all transactions in the blockchain to calculate current balance
-        for block in blockchain.chain:
-            if isinstance(block.transactions, list):
-                for tx in block.transactions:
-                    if isinstance(tx, dict):
-                        # Handle transaction from blockchain
-                        if tx.get('sender') == account_name:
-                            # Subtract the amount sent (including zakat)
-                            if tx.get('type') == 'transfer':
-                                balance -= tx.get('amount', 0)
-                                # Also subtract zakat amount
-                                zakat_amount = tx.get('amount', 0) * 0.025
-                                balance -= zakat_amount
-                            elif tx.get('type') == 'zakat':
-                                balance -= tx.get('amount', 0)
-                        
-                        if tx.get('receiver') == account_name:
-                            # Add the amount received
-                            balance += tx.get('amount', 0)
-        
-        return balance
+        # The blockchain keeps balances up to date as each block is added
+        return blockchain.calculate_account_balance_from_history(account_name)
 
-    def apply(self, accounts):
+    def validate_and_apply(self, accounts):
         """
-        Apply the transaction to the accounts dictionary.
-        This method is used for immediate balance updates after validation
+        Validate the transaction and apply it to the accounts dictionary in a single pass
+        Each account is looked up once and the same references are used for the update
         """
         # Validate that both sender and receiver exist
-        if self.sender not in accounts:
+        sender_account = accounts.get(self.sender)
+        if sender_account is None:
             raise Exception(f"Sender account '{self.sender}' does not exist.")
         
-        if self.receiver not in accounts:
+        receiver_account = accounts.get(self.receiver)
+        if receiver_account is None:
             raise Exception(f"Receiver account '{self.receiver}' does not exist.")
 
         # Validate amount is positive
         if self.amount <= 0:
             raise Exception("Transaction amount must be positive.")
 
+        # Check for self-transaction
+        if self.sender == self.receiver:
+            raise Exception("Sender and receiver cannot be the same")
+
         # Check if sender has sufficient balance
-        if accounts[self.sender] < self.amount:
-            raise Exception(f"Insufficient balance. {self.sender} has ${accounts[self.sender]:.2f} but needs ${self.amount:.2f}")
+        if sender_account.balance < self.amount:
+            raise Exception(f"Insufficient balance. {self.sender} has ${sender_account.balance:.2f} but needs ${self.amount:.2f}")
 
         # Perform the transaction
-        accounts[self.sender] -= self.amount
-        accounts[self.receiver] += self.amount
+        sender_account.balance -= self.amount
+        receiver_account.balance += self.amount
 
+        return True
+
+    def apply(self, accounts):
+        """
+        Apply the transaction to the accounts dictionary.
+        Kept for existing callers; new code should use validate_and_apply
+        """
+        self.validate_and_apply(accounts)
         return accounts
 
     def to_dict(self):
         """
         Convert transaction to dictionary for serialization
+        The dictionary is built once and reused, so callers must not modify it
         """
-        return {
-            'sender': self.sender,
-            'receiver': self.receiver,
-            'amount': self.amount,
-            'timestamp': self.timestamp
-        }
+        if self._dict is None:
+            self._dict = {
+                'sender': self.sender,
+                'receiver': self.receiver,
+                'amount': self.amount,
+                'timestamp': self.timestamp
+            }
+        return self._dict
 
     def validate(self):
         """
         Validate transaction data
+        Cheapest checks run first
         """
-        if not self.sender or not self.receiver:
-            return False, "Sender and receiver cannot be empty"
+        if self.amount <= 0:
+            return False, "Amount must be positive"
         
         if self.sender == self.receiver:
             return False, "Sender and receiver cannot be the same"
         
-        if self.amount <= 0:
-            return False, "Amount must be positive"
+        if not (self.sender and self.receiver):
+            return False, "Sender and receiver cannot be empty"
         
         return True, "Transaction is valid"
 